@@ -1,3 +1,5 @@
+from pathlib import Path
+
 NEWS_SOURCES = [
     {
         "name": "Al Jazeera",
@@ -47,6 +49,11 @@ GOOGLE_NEWS_FEEDS = [
 
 SCRAPE_INTERVAL_SECONDS = 3600  # 1 hour
 
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# Failed Nominatim lookups are retried after this long (cached successes never expire)
+GEOCODE_NEGATIVE_TTL_SECONDS = 7 * 24 * 3600  # 7 days
+
 CONFLICT_KEYWORDS = [
     "bomb", "bombing", "strike", "airstrike", "air strike",
     "missile", "explosion", "shelling", "artillery", "blast",
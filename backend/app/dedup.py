@@ -0,0 +1,159 @@
+"""Duplicate detection for incident titles.
+
+Titles are reduced to MinHash signatures over character 3-gram shingles and
+indexed with LSH banding, so wire stories re-published under slightly
+different headlines collapse into one incident. Titles only match when they
+carry the same numbers, so "kills 3" and "kills 30" stay separate incidents.
+A rolling Bloom filter in front of it remembers exact titles already seen.
+"""
+
+from __future__ import annotations
+
+import re
+import math
+import random
+import struct
+import hashlib
+
+from app.normalize import normalize
+
+NUM_PERM = 64
+BANDS = 8  # 8 bands x 8 rows: candidate pairs start around Jaccard ~0.77
+ROWS = NUM_PERM // BANDS
+THRESHOLD = 0.8
+SHINGLE_SIZE = 3
+
+_DIGITS_RE = re.compile(r"\d+")
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Fixed seed so signatures are stable across processes
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def _shingles(title: str) -> set[str]:
+    text = normalize(title)
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(title: str) -> tuple[int, ...]:
+    """Return the MinHash signature of a title."""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little")
+        for s in _shingles(title)
+    ]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def numbers(title: str) -> tuple[int, ...]:
+    """Return the numbers in a title, sorted; near-duplicates must share them exactly."""
+    return tuple(sorted(int(d) for d in _DIGITS_RE.findall(normalize(title))))
+
+
+def similarity(sig_a: tuple[int, ...], sig_b: tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / NUM_PERM
+
+
+class NearDuplicateIndex:
+    """LSH index over title signatures answering "seen something like this?"."""
+
+    def __init__(self) -> None:
+        self._buckets: list[dict[tuple, list[tuple[int, ...]]]] = [{} for _ in range(BANDS)]
+
+    def _bands(self, sig: tuple[int, ...], nums: tuple[int, ...]):
+        # A one-digit change barely moves the shingles ("12 killed" vs "15 killed"
+        # estimates ~0.83), so the numbers are part of every bucket key
+        for i in range(BANDS):
+            yield self._buckets[i], (nums, sig[i * ROWS:(i + 1) * ROWS])
+
+    def contains(self, sig: tuple[int, ...], nums: tuple[int, ...] = ()) -> bool:
+        """True if an indexed signature with the same numbers is at least THRESHOLD similar to sig."""
+        for bucket, band in self._bands(sig, nums):
+            for candidate in bucket.get(band, ()):
+                if similarity(sig, candidate) >= THRESHOLD:
+                    return True
+        return False
+
+    def add(self, sig: tuple[int, ...], nums: tuple[int, ...] = ()) -> None:
+        for bucket, band in self._bands(sig, nums):
+            bucket.setdefault(band, []).append(sig)
+
+    def add_if_new(self, title: str) -> bool:
+        """Index the title unless a near-duplicate is present. Returns True if added."""
+        sig, nums = minhash(title), numbers(title)
+        if self.contains(sig, nums):
+            return False
+        self.add(sig, nums)
+        return True
+
+
+class RollingBloomFilter:
+    """Two-generation Bloom filter for "have we seen this key?" in constant memory.
+
+    Keys go into the current generation; once it holds ``capacity`` keys it
+    becomes the previous generation and a fresh one starts, so keys age out
+    after roughly 2x capacity newer insertions. False positives (default 1%)
+    mean a small fraction of genuinely new keys are reported as seen.
+    """
+
+    _HEADER = struct.Struct("<II")  # capacity, keys in current generation
+
+    def __init__(self, capacity: int = 10_000, error_rate: float = 0.01) -> None:
+        self.capacity = capacity
+        self._num_bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self._num_hashes = max(1, round(self._num_bits / capacity * math.log(2)))
+        self._current = bytearray((self._num_bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self._num_bits for i in range(self._num_hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        positions = self._positions(key)
+        return any(
+            all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+            for bits in (self._current, self._previous)
+        )
+
+    def add(self, key: str) -> None:
+        if self._count >= self.capacity:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+        for p in self._positions(key):
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+
+    def to_bytes(self) -> bytes:
+        return self._HEADER.pack(self.capacity, self._count) + self._current + self._previous
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int = 10_000, error_rate: float = 0.01) -> RollingBloomFilter:
+        """Restore a filter saved with to_bytes. Raises ValueError if the layout doesn't match."""
+        bloom = cls(capacity, error_rate)
+        size = len(bloom._current)
+        if len(data) != cls._HEADER.size + 2 * size:
+            raise ValueError("Bloom filter size mismatch")
+        saved_capacity, count = cls._HEADER.unpack_from(data)
+        if saved_capacity != capacity:
+            raise ValueError("Bloom filter capacity mismatch")
+        offset = cls._HEADER.size
+        bloom._current[:] = data[offset:offset + size]
+        bloom._previous[:] = data[offset + size:]
+        bloom._count = count
+        return bloom
@@ -0,0 +1,69 @@
+"""Casualty counts and incident ids shared by the legacy scraper and the scraper services."""
+
+from __future__ import annotations
+
+import re
+import uuid
+
+# --- Casualty extraction patterns ---
+CASUALTY_PATTERNS = [
+    re.compile(r"(\d+)\s*(?:people\s+)?(?:were\s+)?(?:killed|dead|died|slain)", re.I),
+    re.compile(r"(?:killed|dead|died|slain)\s+(\d+)", re.I),
+    re.compile(r"(?:at\s+least\s+)(\d+)\s*(?:people\s+)?(?:killed|dead|died)", re.I),
+    re.compile(r"death\s+toll[^.]*?(\d+)", re.I),
+    re.compile(r"(\d+)\s*(?:casualties|fatalities)", re.I),
+    re.compile(r"killing\s+(?:at\s+least\s+)?(\d+)", re.I),
+    re.compile(r"(\d+)\s+deaths?\b", re.I),
+    re.compile(r"claimed\s+(?:the\s+)?(?:lives?\s+of\s+)?(\d+)", re.I),
+    re.compile(r"left\s+(?:at\s+least\s+)?(\d+)\s*(?:people\s+)?dead", re.I),
+    re.compile(r"(\d+)\s*(?:people\s+)?(?:lost\s+their\s+lives|perished)", re.I),
+    re.compile(r"(\d+)\s*(?:people\s+)?confirmed\s+dead", re.I),
+    re.compile(r"(?:toll|count)\s+(?:has\s+)?(?:risen?\s+to|reached?)\s+(\d+)", re.I),
+]
+
+WOUNDED_PATTERNS = [
+    re.compile(r"(\d+)\s*(?:people\s+)?(?:were\s+)?(?:wounded|injured|hurt)", re.I),
+    re.compile(r"(?:wounded|injured|hurt)\s+(\d+)", re.I),
+    re.compile(r"(?:at\s+least\s+)(\d+)\s*(?:people\s+)?(?:wounded|injured)", re.I),
+    re.compile(r"(?:wounding|injuring)\s+(?:at\s+least\s+)?(\d+)", re.I),
+    re.compile(r"(\d+)\s*(?:people\s+)?(?:hospitalized|taken\s+to\s+hospital)", re.I),
+    re.compile(r"(\d+)\s*(?:people\s+)?(?:treated\s+for)", re.I),
+]
+
+
+def _fuse_patterns(patterns: list[re.Pattern]) -> re.Pattern:
+    """Combine single-group patterns into one alternation scanned in a single pass.
+
+    Stays on the stdlib engine: RE2's digit, space and word-boundary classes are
+    ASCII-only, so it would miss counts next to non-breaking spaces or in
+    non-ASCII digits.
+    """
+    return re.compile("|".join(f"(?:{p.pattern})" for p in patterns), re.I)
+
+
+_CASUALTY_RE = _fuse_patterns(CASUALTY_PATTERNS)
+_WOUNDED_RE = _fuse_patterns(WOUNDED_PATTERNS)
+
+
+def _extract_count(text: str, pattern: re.Pattern, max_threshold: int) -> int:
+    """Extract the highest matching number from text using a fused alternation pattern."""
+    result = 0
+    for match in pattern.finditer(text):
+        # Each alternative has exactly one group, so the last matched group is the count
+        num = int(match[match.lastindex])
+        if num < max_threshold:
+            result = max(result, num)
+    return result
+
+
+def extract_killed(text: str) -> int:
+    return _extract_count(text, _CASUALTY_RE, 10_000)
+
+
+def extract_wounded(text: str) -> int:
+    return _extract_count(text, _WOUNDED_RE, 50_000)
+
+
+def incident_id(source_url: str, title: str) -> str:
+    """Deterministic incident id, so re-scraping an article yields the same id."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source_url}|{title}"))
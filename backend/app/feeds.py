@@ -0,0 +1,251 @@
+"""RSS/Atom feed and HTML page parsing shared by the legacy scraper and the scraper services."""
+
+from __future__ import annotations
+
+import re
+import html
+import logging
+from io import BytesIO
+from datetime import datetime, timezone
+
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+_XML_DECL_RE = re.compile(r"^\s*<\?xml[^>]*\?>")
+_XML_ENCODING_RE = re.compile(rb"^\s*<\?xml[^>]*?encoding=[\"']([\w.:-]+)")
+_CDATA_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>", re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WHITESPACE_RE = re.compile(r"\s+")
+_ARTICLE_CLASS_RE = re.compile(r"article|story|content|body|post")
+
+# One libxml2 HTML parser reused for article pages, listings and feed descriptions
+HTML_PARSER = lxml.html.HTMLParser(remove_comments=True, remove_pis=True, collect_ids=False)
+
+
+# ---------------------------------------------------------------------------
+# HTML pages
+# ---------------------------------------------------------------------------
+
+def parse_html(html_text: str) -> lxml.html.HtmlElement | None:
+    """Parse a page with the shared parser; None for an empty document."""
+    try:
+        # lxml rejects str input that still carries an XML encoding declaration
+        tree = lxml.html.document_fromstring(_XML_DECL_RE.sub("", html_text, count=1), parser=HTML_PARSER)
+    except etree.ParserError:
+        return None
+    # BeautifulSoup's get_text skipped these; keep their contents out of extracted text
+    etree.strip_elements(tree, "script", "style", with_tail=False)
+    return tree
+
+
+def element_text(el: lxml.html.HtmlElement) -> str:
+    """Text of an element with each piece stripped, like BeautifulSoup's get_text(strip=True)."""
+    return "".join(s.strip() for s in el.itertext())
+
+
+def article_container(tree: lxml.html.HtmlElement) -> lxml.html.HtmlElement:
+    """The element holding the article body: <article>, a story/content div, <main>, or the whole page."""
+    container = next(tree.iter("article"), None)
+    if container is None:
+        container = next(
+            (el for el in tree.iter("div") if _ARTICLE_CLASS_RE.search(el.get("class", ""))),
+            None,
+        )
+    if container is None:
+        container = next(tree.iter("main"), None)
+    return container if container is not None else tree
+
+
+def article_date(tree: lxml.html.HtmlElement) -> str:
+    """YYYY-MM-DD from the page's first <time datetime>, or today."""
+    time_tag = next(tree.iter("time"), None)
+    if time_tag is not None and time_tag.get("datetime"):
+        return time_tag.get("datetime")[:10]
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+# ---------------------------------------------------------------------------
+# RSS / Atom feeds
+# ---------------------------------------------------------------------------
+
+def _localname(elem: etree._Element) -> str:
+    tag = elem.tag
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+
+def _child(elem: etree._Element, *names: str, ns: bool = True) -> etree._Element | None:
+    """First child whose local name is in names; ns=False skips namespaced ones (atom:link)."""
+    for child in elem:
+        if _localname(child) in names and (ns or not child.tag.startswith("{")):
+            return child
+    return None
+
+
+def _text(elem: etree._Element | None) -> str:
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+
+def _clean_cdata(s: str) -> str:
+    """Unwrap CDATA sections."""
+    return _CDATA_RE.sub(r"\1", s).strip()
+
+
+def _feed_title(s: str) -> str:
+    # lxml has decoded entities already, except inside CDATA sections
+    return html.unescape(s) if "&" in s else s
+
+
+def _html_text(s: str) -> str:
+    """Plain text of an HTML snippet embedded in a feed field, whitespace collapsed."""
+    if "<" in s or "&" in s:
+        # Feeds often escape the markup, so the decoded field is itself HTML
+        try:
+            s = " ".join(lxml.html.fragment_fromstring(s, create_parent="div", parser=HTML_PARSER).itertext())
+        except (etree.ParserError, AssertionError, ValueError):
+            # Whole-document markup ("<html><head></head></html>") isn't a fragment
+            s = html.unescape(_TAG_RE.sub(" ", s))
+    return _WHITESPACE_RE.sub(" ", s).strip()
+
+
+def parse_rss_entries(xml: bytes, charset: str | None = None) -> list[dict]:
+    """Parse raw RSS/Atom feed bytes in one streaming lxml pass.
+
+    libxml2 decodes using the document's XML declaration; the HTTP charset is
+    only applied when there isn't one. Falls back to the regex parser for
+    feeds that aren't well-formed XML.
+    """
+    decl = _XML_ENCODING_RE.match(xml[:128])
+    declared = decl.group(1).decode() if decl else None
+    items: list[dict] = []
+    atom_entries: list[dict] = []
+    try:
+        for _, elem in etree.iterparse(
+            BytesIO(xml), events=("end",), resolve_entities=False, encoding=None if declared else charset,
+        ):
+            name = _localname(elem)
+            if name == "item":
+                title = _text(_child(elem, "title"))
+                if title:
+                    link_el = _child(elem, "link", ns=False)
+                    link = _text(link_el)
+                    if not link and link_el is not None:
+                        link = link_el.get("href", "")
+                    source_el = _child(elem, "source")
+                    items.append({
+                        "title": _feed_title(title),
+                        "link": link,
+                        "summary": _html_text(_text(_child(elem, "description"))),
+                        "date": _text(_child(elem, "pubDate")),
+                        "source": _text(source_el),
+                        "source_url": source_el.get("url", "").strip() if source_el is not None else "",
+                    })
+            elif name == "entry":
+                title = _text(_child(elem, "title"))
+                if title:
+                    link_el = _child(elem, "link")
+                    summary = _text(_child(elem, "summary", "content"))
+                    atom_entries.append({
+                        "title": _feed_title(title),
+                        "link": link_el.get("href", "") if link_el is not None else "",
+                        "summary": _html_text(summary),
+                        "date": _text(_child(elem, "published", "updated")),
+                        "source": "",
+                        "source_url": "",
+                    })
+            else:
+                continue
+            # Drop finished items so memory stays flat on large feeds
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    except (etree.XMLSyntaxError, LookupError) as e:
+        logger.debug(f"Feed is not well-formed XML ({e}), falling back to regex parsing")
+        try:
+            xml_text = xml.decode(declared or charset or "utf-8", "replace")
+        except LookupError:
+            xml_text = xml.decode("utf-8", "replace")
+        return _parse_rss_entries_regex(xml_text)
+
+    return items or atom_entries
+
+
+def _split_blocks(xml_text: str, tag: str) -> list[str]:
+    """Inner text of each <tag>...</tag> block, found with plain str.find scans."""
+    start_tag, end_tag = f"<{tag}>", f"</{tag}>"
+    blocks: list[str] = []
+    i = 0
+    while True:
+        s = xml_text.find(start_tag, i)
+        if s < 0:
+            break
+        s += len(start_tag)
+        e = xml_text.find(end_tag, s)
+        if e < 0:
+            break
+        blocks.append(xml_text[s:e])
+        i = e + len(end_tag)
+    return blocks
+
+
+def _parse_rss_entries_regex(xml_text: str) -> list[dict]:
+    """Parse RSS/Atom feed entries using regex, tolerating malformed markup."""
+    entries: list[dict] = []
+
+    # RSS <item> blocks
+    for item_xml in _split_blocks(xml_text, "item"):
+        title_m = re.search(r"<title[^>]*>(.*?)</title>", item_xml, re.DOTALL)
+        link_m = re.search(r"<link[^>]*>\s*(.*?)\s*</link>", item_xml, re.DOTALL)
+        # Some feeds have link as self-closing with href
+        if not link_m or not link_m.group(1).strip():
+            link_m = re.search(r'<link[^>]*href=["\']([^"\']+)["\']', item_xml)
+        desc_m = re.search(r"<description[^>]*>(.*?)</description>", item_xml, re.DOTALL)
+        date_m = re.search(r"<pubDate[^>]*>(.*?)</pubDate>", item_xml, re.DOTALL)
+        source_m = re.search(r'<source[^>]*url=["\']([^"\']*)["\'][^>]*>(.*?)</source>', item_xml, re.DOTALL)
+
+        raw_title = title_m.group(1).strip() if title_m else ""
+        if not raw_title:
+            continue
+
+        title = _clean_cdata(raw_title)
+        link = _clean_cdata(link_m.group(1).strip()) if link_m else ""
+        desc = _clean_cdata(desc_m.group(1).strip()) if desc_m else ""
+        # Strip HTML tags from description and decode entities
+        desc = _TAG_RE.sub(" ", desc)
+        desc = html.unescape(desc).strip()
+        desc = _WHITESPACE_RE.sub(" ", desc)
+
+        date = date_m.group(1).strip() if date_m else ""
+
+        entries.append({
+            "title": html.unescape(title),
+            "link": link,
+            "summary": desc,
+            "date": date,
+            "source": source_m.group(2).strip() if source_m else "",
+            "source_url": source_m.group(1).strip() if source_m else "",
+        })
+
+    # Atom <entry> fallback
+    if not entries:
+        for entry_xml in _split_blocks(xml_text, "entry"):
+            title_m = re.search(r"<title[^>]*>(.*?)</title>", entry_xml, re.DOTALL)
+            link_m = re.search(r'<link[^>]*href=["\']([^"\']+)["\']', entry_xml)
+            summary_m = re.search(r"<(?:summary|content)[^>]*>(.*?)</(?:summary|content)>", entry_xml, re.DOTALL)
+            date_m = re.search(r"<(?:published|updated)[^>]*>(.*?)</(?:published|updated)>", entry_xml, re.DOTALL)
+
+            raw_title = title_m.group(1).strip() if title_m else ""
+            if not raw_title:
+                continue
+
+            entries.append({
+                "title": html.unescape(_clean_cdata(raw_title)),
+                "link": link_m.group(1) if link_m else "",
+                "summary": _TAG_RE.sub(" ", summary_m.group(1)).strip() if summary_m else "",
+                "date": date_m.group(1).strip() if date_m else "",
+                "source": "",
+                "source_url": "",
+            })
+
+    return entries
@@ -0,0 +1,33 @@
+"""HTTP request settings shared by the legacy scraper and the scraper services."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
+from contextvars import ContextVar
+from urllib.parse import urlparse
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+}
+
+# Article fetches run concurrently, but at most this many at once per host
+MAX_CONCURRENT_PER_HOST = 8
+# Host -> semaphore for the current run. Whoever starts the run owns the dict
+# (ScraperGateway next to its client, scrape_all_sources per run), since a
+# semaphore binds to the event loop that first waits on it
+host_semaphores: ContextVar[dict[str, asyncio.Semaphore] | None] = ContextVar("host_semaphores", default=None)
+
+
+def host_semaphore(url: str) -> AbstractAsyncContextManager:
+    """Per-host limit for url; unlimited when no run has set host_semaphores."""
+    semaphores = host_semaphores.get()
+    if semaphores is None:
+        return nullcontext()
+    host = urlparse(url).netloc
+    sem = semaphores.get(host)
+    if sem is None:
+        sem = semaphores[host] = asyncio.Semaphore(MAX_CONCURRENT_PER_HOST)
+    return sem
@@ -1,15 +1,27 @@
+import json
+import os
+import time
+import asyncio
 import logging
+import threading
+from bisect import bisect_right
+from functools import partial
+from itertools import accumulate
+
+import ahocorasick
+from geopy.adapters import RequestsAdapter
 from geopy.geocoders import Nominatim
-from geopy.extra.rate_limiter import RateLimiter
+
+from app.config import DATA_DIR, GEOCODE_NEGATIVE_TTL_SECONDS
+from app.normalize import normalize
 
 logger = logging.getLogger(__name__)
 
-# Hardcoded coordinates for common Iranian cities/locations
-KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
+# Hardcoded coordinates for common Iranian cities/locations — one entry per place
+CANONICAL_LOCATIONS: dict[str, tuple[float, float]] = {
     # Iran — major cities
     "tehran": (35.6892, 51.3890),
     "isfahan": (32.6546, 51.6680),
-    "esfahan": (32.6546, 51.6680),
     "tabriz": (38.0800, 46.2919),
     "shiraz": (29.5918, 52.5837),
     "mashhad": (36.2605, 59.6168),
@@ -19,7 +31,6 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "karaj": (35.8400, 50.9391),
     "bushehr": (28.9234, 50.8203),
     "bandar abbas": (27.1865, 56.2808),
-    "bandar-abbas": (27.1865, 56.2808),
     "rasht": (37.2808, 49.5832),
     "kerman": (30.2839, 57.0834),
     "hamadan": (34.7990, 48.5150),
@@ -38,7 +49,6 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "abadan": (30.3392, 48.3043),
     "dezful": (32.3814, 48.4016),
     "khorramshahr": (30.4265, 48.1714),
-    "khoramshahr": (30.4265, 48.1714),
     "chabahar": (25.2919, 60.6430),
     "bam": (29.1060, 58.3569),
     "bojnurd": (37.4747, 57.3290),
@@ -61,7 +71,6 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "tel aviv": (32.0853, 34.7818),
     "haifa": (32.7940, 34.9896),
     "nevatim afb": (31.2083, 34.6667),
-    "nevatim": (31.2083, 34.6667),
     "dimona": (31.0700, 35.2100),
     "jerusalem": (31.7683, 35.2137),
     "beer sheva": (31.2520, 34.7915),
@@ -70,10 +79,8 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "ramon airbase": (30.7760, 34.6670),
     # Iraq (US bases / cities)
     "al asad air base": (33.7856, 42.4411),
-    "al asad": (33.7856, 42.4411),
     "erbil": (36.1912, 44.0119),
     "baghdad": (33.3152, 44.3661),
-    "ain al asad": (33.7856, 42.4411),
     # Syria
     "damascus": (33.5138, 36.2765),
     "aleppo": (36.2021, 37.1343),
@@ -82,7 +89,6 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "beirut": (33.8938, 35.5018),
     # Qatar
     "al udeid air base": (25.1171, 51.3150),
-    "al udeid": (25.1171, 51.3150),
     # Bahrain
     "manama": (26.2285, 50.5860),
     # UAE
@@ -92,39 +98,231 @@ KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
     "arabian sea": (18.0000, 62.0000),
 }
 
+# Alternate spellings and short forms -> canonical name
+LOCATION_ALIASES: dict[str, str] = {
+    "esfahan": "isfahan",
+    "bandar-abbas": "bandar abbas",
+    "khoramshahr": "khorramshahr",
+    "nevatim": "nevatim afb",
+    "al asad": "al asad air base",
+    "ain al asad": "al asad air base",
+    "al udeid": "al udeid air base",
+}
+
+# Every recognised name -> coordinates. Aliases share the canonical tuple.
+KNOWN_LOCATIONS: dict[str, tuple[float, float]] = {
+    **CANONICAL_LOCATIONS,
+    **{alias: CANONICAL_LOCATIONS[name] for alias, name in LOCATION_ALIASES.items()},
+}
+
+GEOCODE_CACHE_FILE = DATA_DIR / "geocode_cache.json"
+
 _geocode_cache: dict[str, tuple[float, float] | None] = {}
 
-geolocator = Nominatim(user_agent="warzone-monitor-app")
-geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1.0)
+# Nominatim results as persisted on disk: name -> {"coords": [lat, lon] | None, "ts": epoch}
+_remote_results: dict[str, dict] = {}
+_remote_lock = threading.Lock()
 
 
-def get_coordinates(location_name: str) -> tuple[float, float] | None:
-    """Convert a location name to (latitude, longitude) coordinates."""
-    normalized = location_name.lower().strip()
+def _load_geocode_cache() -> None:
+    """Seed the in-memory cache with Nominatim results from previous runs."""
+    if not GEOCODE_CACHE_FILE.exists():
+        return
+    try:
+        data = json.loads(GEOCODE_CACHE_FILE.read_text())
+    except Exception as e:
+        logger.warning(f"Failed to load geocode cache: {e}")
+        return
+
+    now = time.time()
+    for name, entry in data.items():
+        coords = entry.get("coords")
+        # Negative results expire so places Nominatim missed get retried
+        if coords is None and now - entry.get("ts", 0) > GEOCODE_NEGATIVE_TTL_SECONDS:
+            continue
+        _remote_results[name] = entry
+        _geocode_cache[name] = tuple(coords) if coords else None
+
+
+def _remember_remote(normalized: str, coords: tuple[float, float] | None) -> None:
+    """Cache a Nominatim result and write the cache file through to disk."""
+    _geocode_cache[normalized] = coords
+    with _remote_lock:
+        _remote_results[normalized] = {"coords": coords, "ts": time.time()}
+        try:
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = GEOCODE_CACHE_FILE.with_suffix(".tmp")
+            tmp.write_text(json.dumps(_remote_results))
+            os.replace(tmp, GEOCODE_CACHE_FILE)
+        except OSError as e:
+            logger.warning(f"Failed to persist geocode cache: {e}")
+
+
+_load_geocode_cache()
+
+
+# Lookup table keyed by normalize()d name, so "Eşfahān" and "Bandar-Abbas" hit directly
+_NORMALIZED_LOCATIONS: dict[str, tuple[float, float]] = {
+    normalize(name): coords for name, coords in KNOWN_LOCATIONS.items()
+}
+
+
+def _build_known_matcher() -> ahocorasick.Automaton:
+    """Build an Aho-Corasick automaton over every known location name."""
+    automaton = ahocorasick.Automaton()
+    for known, coords in _NORMALIZED_LOCATIONS.items():
+        automaton.add_word(known, (known, coords))
+    automaton.make_automaton()
+    return automaton
+
+
+# Single-pass "known location inside query" lookup
+_KNOWN_AC = _build_known_matcher()
+
+# "Query inside known location" lookup: all names joined by a separator that
+# can never appear in a query, so one str.find() replaces a per-key scan.
+_KNOWN_SEP = "\x00"
+_KNOWN_NAMES = list(_NORMALIZED_LOCATIONS)
+_KNOWN_JOINED = _KNOWN_SEP.join(_KNOWN_NAMES)
+_KNOWN_OFFSETS = list(accumulate((len(k) + 1 for k in _KNOWN_NAMES[:-1]), initial=0))
+
+
+def _match_known(normalized: str) -> tuple[float, float] | None:
+    """Find a known location contained in, or containing, the normalized name."""
+    # Known name inside the query — prefer the longest (most specific) hit
+    best: tuple[str, tuple[float, float]] | None = None
+    for _, (known, coords) in _KNOWN_AC.iter(normalized):
+        if best is None or len(known) > len(best[0]):
+            best = (known, coords)
+    if best:
+        return best[1]
+
+    # Query inside a known name
+    if _KNOWN_SEP in normalized:
+        return None
+    pos = _KNOWN_JOINED.find(normalized)
+    if pos < 0:
+        return None
+    return _NORMALIZED_LOCATIONS[_KNOWN_NAMES[bisect_right(_KNOWN_OFFSETS, pos) - 1]]
+
+
+# One keep-alive session for every lookup. The token bucket only lets one
+# request through at a time, so a single pooled connection is enough.
+geolocator = Nominatim(
+    user_agent="warzone-monitor-app",
+    adapter_factory=partial(RequestsAdapter, pool_connections=1, pool_maxsize=1),
+)
+
+
+class _TokenBucket:
+    """Thread-safe token bucket shared by the sync and async lookup paths.
+
+    Callers reserve a token up front and are told how long to wait for it,
+    so async callers sleep on the event loop instead of blocking it.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self._rate)
+
+    def acquire(self) -> None:
+        time.sleep(self._reserve())
+
+    async def acquire_async(self) -> None:
+        await asyncio.sleep(self._reserve())
+
+
+# Nominatim usage policy: at most one request per second
+_nominatim_bucket = _TokenBucket(rate=1.0, capacity=1)
+
+# Lookups currently waiting on Nominatim, so concurrent callers share one request
+_inflight: dict[str, asyncio.Task] = {}
+
+_MISS = object()
+
+
+def _lookup_local(normalized: str) -> tuple[float, float] | None | object:
+    """Resolve a name without touching the network. Returns _MISS if unknown."""
+    if not normalized:
+        return None
 
     # Check hardcoded locations first
-    if normalized in KNOWN_LOCATIONS:
-        return KNOWN_LOCATIONS[normalized]
+    if normalized in _NORMALIZED_LOCATIONS:
+        return _NORMALIZED_LOCATIONS[normalized]
 
     # Check cache
     if normalized in _geocode_cache:
         return _geocode_cache[normalized]
 
     # Check if any known location is a substring
-    for known, coords in KNOWN_LOCATIONS.items():
-        if known in normalized or normalized in known:
-            _geocode_cache[normalized] = coords
-            return coords
+    coords = _match_known(normalized)
+    if coords:
+        _geocode_cache[normalized] = coords
+        return coords
+
+    return _MISS
+
 
-    # Try geocoding via Nominatim
+def _geocode_remote(location_name: str, normalized: str) -> tuple[float, float] | None:
+    """Query Nominatim (blocking). The caller must already hold a bucket token."""
     try:
-        result = geocode(f"{location_name}, Iran")
+        result = geolocator.geocode(f"{location_name}, Iran")
         if result:
             coords = (result.latitude, result.longitude)
-            _geocode_cache[normalized] = coords
+            _remember_remote(normalized, coords)
             return coords
     except Exception as e:
+        # Transient failure — don't persist, just skip this name for the session
         logger.warning(f"Geocoding failed for '{location_name}': {e}")
+        _geocode_cache[normalized] = None
+        return None
 
-    _geocode_cache[normalized] = None
+    _remember_remote(normalized, None)
     return None
+
+
+async def _geocode_remote_async(location_name: str, normalized: str) -> tuple[float, float] | None:
+    await _nominatim_bucket.acquire_async()
+    return await asyncio.to_thread(_geocode_remote, location_name, normalized)
+
+
+def get_coordinates(location_name: str) -> tuple[float, float] | None:
+    """Convert a location name to (latitude, longitude) coordinates.
+
+    Blocks on Nominatim for unknown names — async code should use
+    get_coordinates_async instead.
+    """
+    normalized = normalize(location_name)
+    coords = _lookup_local(normalized)
+    if coords is not _MISS:
+        return coords
+
+    _nominatim_bucket.acquire()
+    return _geocode_remote(location_name, normalized)
+
+
+async def get_coordinates_async(location_name: str) -> tuple[float, float] | None:
+    """Async variant of get_coordinates that never blocks the event loop."""
+    normalized = normalize(location_name)
+    coords = _lookup_local(normalized)
+    if coords is not _MISS:
+        return coords
+
+    task = _inflight.get(normalized)
+    if task is None:
+        task = asyncio.create_task(_geocode_remote_async(location_name, normalized))
+        _inflight[normalized] = task
+        task.add_done_callback(lambda _: _inflight.pop(normalized, None))
+    # Shield so one cancelled caller doesn't abort the lookup for the others
+    return await asyncio.shield(task)
@@ -0,0 +1,46 @@
+"""Multi-pattern keyword matchers built once from the config keyword lists."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+import ahocorasick
+
+from app.config import CONFLICT_KEYWORDS, IRAN_KEYWORDS
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds any of a set of keywords in one pass.
+
+    Matching is plain substring containment, the same semantics as the
+    ``any(kw in text for kw in keywords)`` loops it replaces. Callers pass
+    text that is already lowercased.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self._automaton = ahocorasick.Automaton()
+        for rank, kw in enumerate(keywords):
+            self._automaton.add_word(kw, (rank, kw))
+        self._automaton.make_automaton()
+
+    def search(self, text: str) -> str | None:
+        """Return the first keyword found in text, or None."""
+        for _, (_, kw) in self._automaton.iter(text):
+            return kw
+        return None
+
+    def longest(self, text: str) -> str | None:
+        """Return the longest keyword found in text, earliest-listed on ties, or None."""
+        best: tuple[int, str] | None = None
+        for _, (rank, kw) in self._automaton.iter(text):
+            if best is None or len(kw) > len(best[1]) or (len(kw) == len(best[1]) and rank < best[0]):
+                best = (rank, kw)
+        return best[1] if best else None
+
+
+CONFLICT_MATCHER = KeywordMatcher(CONFLICT_KEYWORDS)
+IRAN_MATCHER = KeywordMatcher(IRAN_KEYWORDS)
+# Either list — used to spot candidate article links on listing pages
+ANY_KEYWORD_MATCHER = KeywordMatcher(CONFLICT_KEYWORDS + IRAN_KEYWORDS)
+# The same keywords as they appear in URL slugs ("air strike" -> "air-strike")
+SLUG_KEYWORD_MATCHER = KeywordMatcher(kw.replace(" ", "-") for kw in CONFLICT_KEYWORDS + IRAN_KEYWORDS)
@@ -1,68 +1,178 @@
-import json
+import os
+import random
 import asyncio
+import hashlib
 import logging
-from pathlib import Path
+from collections import Counter
 from datetime import datetime, timezone
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter, ValidationError
 
+from app.dedup import NearDuplicateIndex, RollingBloomFilter
+from app.normalize import normalize
 from app.models import BombingIncident, StatsResponse, ScrapeResponse, IntegrationInfo, IntegrationToggle
 from app.scrapers import ALL_SCRAPERS
 from app.scrapers.gateway import ScraperGateway
-from app.config import SCRAPE_INTERVAL_SECONDS
+from app.config import SCRAPE_INTERVAL_SECONDS, DATA_DIR
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
 
-DATA_DIR = Path(__file__).parent.parent / "data"
 INCIDENTS_FILE = DATA_DIR / "incidents.json"
+# Incidents merged since the last snapshot, one JSON object per line
+INCIDENTS_JOURNAL = DATA_DIR / "incidents.jsonl"
+# Exact titles already seen by _merge_incidents, kept or rejected
+SEEN_TITLES_FILE = DATA_DIR / "seen_titles.bloom"
+
+# Retry delay after a failed scheduled scrape: doubles per failure, capped at the interval
+SCRAPE_RETRY_BASE_SECONDS = 60
+SCRAPE_RETRY_JITTER_SECONDS = 30
 
 # In-memory store
 incidents_store: list[BombingIncident] = []
+incidents_by_id: dict[str, BombingIncident] = {}
+# model_dump() of each stored incident, kept parallel to incidents_store
+incident_dicts: list[dict] = []
+title_index = NearDuplicateIndex()
+seen_titles = RollingBloomFilter()
+# Serialized /api/incidents body and its ETag, rebuilt lazily after a merge
+incidents_json: bytes | None = None
+incidents_etag: str = ""
+# Running aggregates behind /api/stats, updated as incidents are merged
+total_killed = 0
+total_wounded = 0
+source_counts: Counter[str] = Counter()
 last_updated: str | None = None
 scrape_task: asyncio.Task | None = None
+# Snapshot/journal writes run in worker threads, one at a time and in order
+_write_lock: asyncio.Lock | None = None
+_pending_writes: set[asyncio.Task] = set()
+
+_incident_list = TypeAdapter(list[BombingIncident])
 
 # Scraper gateway (single instance, shared across requests)
 gateway = ScraperGateway(ALL_SCRAPERS)
 
 
 def _load_incidents() -> list[BombingIncident]:
-    """Load incidents from JSON file."""
+    """Load incidents from the JSON snapshot plus any journaled additions."""
+    incidents: list[BombingIncident] = []
     if INCIDENTS_FILE.exists():
         try:
-            data = json.loads(INCIDENTS_FILE.read_text())
-            return [BombingIncident(**item) for item in data]
+            # One parse + validate pass over the whole snapshot
+            incidents.extend(_incident_list.validate_json(INCIDENTS_FILE.read_bytes()))
         except Exception as e:
             logger.error(f"Failed to load incidents: {e}")
-    return []
 
+    if INCIDENTS_JOURNAL.exists():
+        # An append that outlived shutdown compaction can repeat snapshot rows
+        seen_ids = {i.id for i in incidents}
+        with INCIDENTS_JOURNAL.open("rb") as f:
+            for line in f:
+                try:
+                    incident = BombingIncident.model_validate_json(line)
+                except ValidationError:
+                    # A crash mid-append can leave a torn last line
+                    logger.warning("Skipping malformed incident journal line")
+                    continue
+                if incident.id not in seen_ids:
+                    incidents.append(incident)
+                    seen_ids.add(incident.id)
+    return incidents
+
+
+def _save_incidents(data: list[dict]) -> None:
+    """Write a full snapshot of the store and clear the journal.
+
+    The snapshot goes to a temp file first and is swapped in with os.replace,
+    so a crash mid-write leaves the previous snapshot intact.
+    """
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = INCIDENTS_FILE.with_suffix(".json.tmp")
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp, INCIDENTS_FILE)
+    INCIDENTS_JOURNAL.unlink(missing_ok=True)
 
-def _save_incidents(items: list[BombingIncident]) -> None:
-    """Save incidents to JSON file."""
+
+def _append_incidents(data: list[dict], seen: bytes) -> None:
+    """Append newly merged incidents to the journal and save the seen-titles filter."""
     DATA_DIR.mkdir(parents=True, exist_ok=True)
-    data = [item.model_dump() for item in items]
-    INCIDENTS_FILE.write_text(json.dumps(data, indent=2))
+    if data:
+        with INCIDENTS_JOURNAL.open("ab") as f:
+            f.writelines(orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE) for item in data)
+    tmp = SEEN_TITLES_FILE.with_suffix(".tmp")
+    tmp.write_bytes(seen)
+    os.replace(tmp, SEEN_TITLES_FILE)
+
+
+def _load_seen_titles() -> RollingBloomFilter:
+    """Load the seen-titles filter from disk, or start an empty one."""
+    if SEEN_TITLES_FILE.exists():
+        try:
+            return RollingBloomFilter.from_bytes(SEEN_TITLES_FILE.read_bytes())
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding seen-titles filter: {e}")
+    return RollingBloomFilter()
+
+
+async def _write(func, *args) -> None:
+    """Run a blocking persistence call in a worker thread, serialized with other writes."""
+    async with _write_lock:
+        await asyncio.to_thread(func, *args)
+
+
+def _on_write_done(task: asyncio.Task) -> None:
+    _pending_writes.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Failed to persist incidents: {task.exception()}")
+
+
+def _schedule_write(func, *args) -> None:
+    """Persist in the background so the caller doesn't wait on serialization or disk."""
+    task = asyncio.create_task(_write(func, *args))
+    _pending_writes.add(task)
+    task.add_done_callback(_on_write_done)
 
 
 def _merge_incidents(new_incidents: list[BombingIncident]) -> int:
-    """Merge new incidents into the store, deduplicating by title. Returns count added."""
-    existing_titles = {i.title.lower().strip() for i in incidents_store}
-    added = 0
+    """Merge new incidents into the store, skipping near-duplicate titles. Returns count added."""
+    global total_killed, total_wounded, incidents_json
+    added: list[dict] = []
+    seen_new = False
     for incident in new_incidents:
-        if incident.title.lower().strip() not in existing_titles:
+        # Feeds are re-polled hourly, so most titles are exact repeats;
+        # the filter skips them before paying for a MinHash signature.
+        key = normalize(incident.title)
+        if key in seen_titles:
+            continue
+        seen_titles.add(key)
+        seen_new = True
+        if title_index.add_if_new(incident.title):
             incidents_store.append(incident)
-            existing_titles.add(incident.title.lower().strip())
-            added += 1
-    if added > 0:
-        _save_incidents(incidents_store)
-    return added
+            incidents_by_id[incident.id] = incident
+            added.append(incident.model_dump())
+            total_killed += incident.killed
+            total_wounded += incident.wounded
+            source_counts[incident.source] += 1
+    if added:
+        incident_dicts.extend(added)
+        incidents_json = None
+    if seen_new:
+        # Not tied to the scrape task, so cancelling it can't abandon the write;
+        # shutdown waits for pending writes before compacting.
+        _schedule_write(_append_incidents, added, seen_titles.to_bytes())
+    return len(added)
 
 
 async def _scheduled_scrape():
     """Background task that scrapes on a schedule."""
     global last_updated
+    failures = 0
     while True:
         try:
             logger.info("Starting scheduled scrape...")
@@ -72,18 +182,42 @@ async def _scheduled_scrape():
                 if added > 0:
                     logger.info(f"Added {added} new incidents (total: {len(incidents_store)})")
             last_updated = datetime.now(timezone.utc).isoformat()
+            failures = 0
+            delay = SCRAPE_INTERVAL_SECONDS
         except Exception as e:
-            logger.error(f"Scheduled scrape failed: {e}")
+            # Retry sooner than the full interval, backing off with jitter
+            delay = min(SCRAPE_INTERVAL_SECONDS, SCRAPE_RETRY_BASE_SECONDS * 2 ** failures)
+            delay += random.uniform(0, SCRAPE_RETRY_JITTER_SECONDS)
+            failures += 1
+            logger.error(f"Scheduled scrape failed (retrying in {delay:.0f}s): {e}")
 
-        await asyncio.sleep(SCRAPE_INTERVAL_SECONDS)
+        await asyncio.sleep(delay)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global incidents_store, last_updated, scrape_task
+    global incidents_store, incidents_by_id, incident_dicts, title_index, seen_titles, last_updated, scrape_task
+    global total_killed, total_wounded, source_counts, incidents_json, _write_lock
+
+    _write_lock = asyncio.Lock()
 
     # Load cached data on startup
-    incidents_store = _load_incidents()
+    incidents_store = await asyncio.to_thread(_load_incidents)
+    incidents_by_id = {i.id: i for i in incidents_store}
+    incident_dicts = [i.model_dump() for i in incidents_store]
+    incidents_json = None
+    title_index = NearDuplicateIndex()
+    seen_titles = await asyncio.to_thread(_load_seen_titles)
+    for incident in incidents_store:
+        title_index.add_if_new(incident.title)
+        key = normalize(incident.title)
+        if key not in seen_titles:
+            seen_titles.add(key)
+    total_killed = sum(i.killed for i in incidents_store)
+    total_wounded = sum(i.wounded for i in incidents_store)
+    source_counts = Counter(i.source for i in incidents_store)
+    if INCIDENTS_JOURNAL.exists():
+        await _write(_save_incidents, incident_dicts)
     last_updated = datetime.now(timezone.utc).isoformat()
     logger.info(f"Loaded {len(incidents_store)} cached incidents")
 
@@ -99,6 +233,13 @@ async def lifespan(app: FastAPI):
             await scrape_task
         except asyncio.CancelledError:
             pass
+    await gateway.aclose()
+
+    # Let in-flight writes land, then fold the journal back into the snapshot
+    if _pending_writes:
+        await asyncio.gather(*_pending_writes, return_exceptions=True)
+    if INCIDENTS_JOURNAL.exists():
+        await _write(_save_incidents, incident_dicts)
 
 
 app = FastAPI(
@@ -106,14 +247,16 @@ app = FastAPI(
     description="API for tracking bombing incidents from news sources",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:4173", "http://localhost:3000"],
+    # Vite dev (5173), Vite preview (4173) and the Node frontend (3000)
+    allow_origin_regex=r"http://(?:localhost:(?:5173|4173|3000)|127\.0\.0\.1:5173)",
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["Content-Type"],
 )
 
 
@@ -121,32 +264,45 @@ app.add_middleware(
 # Incident endpoints
 # ---------------------------------------------------------------------------
 
-@app.get("/api/incidents", response_model=list[BombingIncident])
-async def get_incidents():
+@app.get("/api/incidents", responses={200: {"model": list[BombingIncident]}})
+async def get_incidents(request: Request):
     """Return all tracked bombing incidents."""
-    return incidents_store
+    global incidents_json, incidents_etag
+    # The body only changes on merge, so serialize once and reuse the bytes
+    if incidents_json is None:
+        incidents_json = orjson.dumps(incident_dicts)
+        incidents_etag = f'"{hashlib.blake2b(incidents_json, digest_size=8).hexdigest()}"'
+
+    headers = {"ETag": incidents_etag}
+    if request.headers.get("if-none-match") == incidents_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=incidents_json, media_type="application/json", headers=headers)
 
 
-@app.get("/api/incidents/{incident_id}", response_model=BombingIncident)
+# Read endpoints below serialize their (already validated) models directly
+# rather than going through response_model re-validation; the schemas are
+# still published via responses=.
+
+@app.get("/api/incidents/{incident_id}", responses={200: {"model": BombingIncident}})
 async def get_incident(incident_id: str):
     """Return a single incident by ID."""
-    for incident in incidents_store:
-        if incident.id == incident_id:
-            return incident
-    raise HTTPException(status_code=404, detail="Incident not found")
+    incident = incidents_by_id.get(incident_id)
+    if incident is None:
+        raise HTTPException(status_code=404, detail="Incident not found")
+    return Response(content=incident.model_dump_json(), media_type="application/json")
 
 
-@app.get("/api/stats", response_model=StatsResponse)
+@app.get("/api/stats", responses={200: {"model": StatsResponse}})
 async def get_stats():
     """Return aggregated statistics."""
-    sources = set(i.source for i in incidents_store)
-    return StatsResponse(
+    stats = StatsResponse(
         total_incidents=len(incidents_store),
-        total_killed=sum(i.killed for i in incidents_store),
-        total_wounded=sum(i.wounded for i in incidents_store),
-        sources_count=len(sources),
+        total_killed=total_killed,
+        total_wounded=total_wounded,
+        sources_count=len(source_counts),
         last_updated=last_updated,
     )
+    return Response(content=stats.model_dump_json(), media_type="application/json")
 
 
 @app.post("/api/scrape", response_model=ScrapeResponse)
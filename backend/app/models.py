@@ -1,8 +1,15 @@
-from pydantic import BaseModel
+from sys import intern
+from pydantic import BaseModel, ConfigDict, field_validator
 from typing import Optional
 
 
 class BombingIncident(BaseModel):
+    # Instances are shared by the store, the id index and the cached dumps,
+    # so they must never change after construction.
+    model_config = ConfigDict(frozen=True)
+    # Drops the per-instance __weakref__ slot; field values live in __dict__
+    __slots__ = ()
+
     id: str
     title: str
     location: str
@@ -20,6 +27,12 @@ class BombingIncident(BaseModel):
     origin_latitude: Optional[float] = None
     origin_longitude: Optional[float] = None
 
+    @field_validator("location", "date", "source", "attacker", "origin_location")
+    @classmethod
+    def _intern_repeated(cls, value: str) -> str:
+        # These repeat across many incidents — share one string object per value
+        return intern(value)
+
 
 class StatsResponse(BaseModel):
     total_incidents: int
@@ -0,0 +1,22 @@
+"""Shared text normalization for location names and incident titles."""
+
+import re
+import unicodedata
+
+# Dashes and slashes separate words; apostrophes and dots/commas are dropped
+_PUNCT_TABLE = str.maketrans({
+    "-": " ", "‐": " ", "–": " ", "—": " ", "/": " ",
+    "'": None, "’": None, ".": None, ",": None,
+})
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip diacritics and punctuation, and collapse whitespace.
+
+    "Eşfahān" -> "esfahan", "Bandar-Abbas" -> "bandar abbas".
+    """
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE_RE.sub(" ", text.lower().translate(_PUNCT_TABLE)).strip()
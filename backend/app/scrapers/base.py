@@ -3,53 +3,37 @@
 from __future__ import annotations
 
 import re
-import html
-import uuid
+import asyncio
 import logging
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
 
 import httpx
-from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
 
-from app.config import CONFLICT_KEYWORDS, IRAN_KEYWORDS
 from app.models import BombingIncident
-from app.geocoder import get_coordinates, KNOWN_LOCATIONS
+from app.keywords import CONFLICT_MATCHER, IRAN_MATCHER, ANY_KEYWORD_MATCHER, SLUG_KEYWORD_MATCHER, KeywordMatcher
+from app.geocoder import get_coordinates_async, KNOWN_LOCATIONS
+from app.extract import extract_killed, extract_wounded, incident_id
+from app.feeds import parse_rss_entries, parse_html, element_text, article_container, article_date
+from app.fetch import host_semaphore
 
 logger = logging.getLogger(__name__)
 
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "en-US,en;q=0.5",
-}
-
-# --- Casualty extraction patterns ---
-CASUALTY_PATTERNS = [
-    re.compile(r"(\d+)\s*(?:people\s+)?(?:were\s+)?(?:killed|dead|died|slain)", re.I),
-    re.compile(r"(?:killed|dead|died|slain)\s+(\d+)", re.I),
-    re.compile(r"(?:at\s+least\s+)(\d+)\s*(?:people\s+)?(?:killed|dead|died)", re.I),
-    re.compile(r"death\s+toll[^.]*?(\d+)", re.I),
-    re.compile(r"(\d+)\s*(?:casualties|fatalities)", re.I),
-    re.compile(r"killing\s+(?:at\s+least\s+)?(\d+)", re.I),
-    re.compile(r"(\d+)\s+deaths?\b", re.I),
-    re.compile(r"claimed\s+(?:the\s+)?(?:lives?\s+of\s+)?(\d+)", re.I),
-    re.compile(r"left\s+(?:at\s+least\s+)?(\d+)\s*(?:people\s+)?dead", re.I),
-    re.compile(r"(\d+)\s*(?:people\s+)?(?:lost\s+their\s+lives|perished)", re.I),
-    re.compile(r"(\d+)\s*(?:people\s+)?confirmed\s+dead", re.I),
-    re.compile(r"(?:toll|count)\s+(?:has\s+)?(?:risen?\s+to|reached?)\s+(\d+)", re.I),
-]
-
-WOUNDED_PATTERNS = [
-    re.compile(r"(\d+)\s*(?:people\s+)?(?:were\s+)?(?:wounded|injured|hurt)", re.I),
-    re.compile(r"(?:wounded|injured|hurt)\s+(\d+)", re.I),
-    re.compile(r"(?:at\s+least\s+)(\d+)\s*(?:people\s+)?(?:wounded|injured)", re.I),
-    re.compile(r"(?:wounding|injuring)\s+(?:at\s+least\s+)?(\d+)", re.I),
-    re.compile(r"(\d+)\s*(?:people\s+)?(?:hospitalized|taken\s+to\s+hospital)", re.I),
-    re.compile(r"(\d+)\s*(?:people\s+)?(?:treated\s+for)", re.I),
-]
-
-_ALL_KEYWORDS = CONFLICT_KEYWORDS + IRAN_KEYWORDS
+_LOCATION_MATCHER = KeywordMatcher(KNOWN_LOCATIONS)
+
+# "in <City>", "near <City>", "struck <City>"
+_LOCATION_CUE_RE = re.compile(
+    r"(?:in|near|outside|targeting|struck|hit|toward|towards|on)\s+"
+    r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
+)
+
+# Feed incidents with a death toll and a description longer than this skip the article fetch
+FEED_COMPLETE_DESCRIPTION_LEN = 150
+
+# Every text node under an article's paragraphs
+_PARAGRAPH_TEXT = etree.XPath(".//p//text()")
 
 
 class BaseScraper(ABC):
@@ -80,32 +64,25 @@ class BaseScraper(ABC):
     @staticmethod
     def is_relevant(text: str, title: str = "") -> bool:
         combined = f"{title} {text}".lower()
-        has_conflict = any(kw in combined for kw in CONFLICT_KEYWORDS)
-        has_iran = any(kw in combined for kw in IRAN_KEYWORDS)
-        return has_conflict and has_iran
+        return CONFLICT_MATCHER.search(combined) is not None and IRAN_MATCHER.search(combined) is not None
 
     @staticmethod
     def extract_killed(text: str) -> int:
-        return _extract_count(text, CASUALTY_PATTERNS, 10_000)
+        return extract_killed(text)
 
     @staticmethod
     def extract_wounded(text: str) -> int:
-        return _extract_count(text, WOUNDED_PATTERNS, 50_000)
+        return extract_wounded(text)
 
     @staticmethod
-    def extract_location(text: str) -> str | None:
-        text_lower = text.lower()
-        sorted_locations = sorted(KNOWN_LOCATIONS.keys(), key=len, reverse=True)
-        for location in sorted_locations:
-            if location in text_lower:
-                return location.title()
-
-        location_re = re.compile(
-            r"(?:in|near|outside|targeting|struck|hit|toward|towards|on)\s+"
-            r"([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)",
-        )
-        for match in location_re.findall(text):
-            coords = get_coordinates(match)
+    async def extract_location(text: str) -> str | None:
+        # Longest known location wins so "bandar abbas" beats any shorter name inside it
+        location = _LOCATION_MATCHER.longest(text.lower())
+        if location:
+            return location.title()
+
+        for match in _LOCATION_CUE_RE.findall(text):
+            coords = await get_coordinates_async(match)
             if coords:
                 return match
         return None
@@ -133,68 +110,11 @@ class BaseScraper(ABC):
         return datetime.now(timezone.utc).strftime("%Y-%m-%d")
 
     @staticmethod
-    def parse_rss_entries(xml_text: str) -> list[dict]:
-        entries: list[dict] = []
-
-        items = re.findall(r"<item>(.*?)</item>", xml_text, re.DOTALL)
-        for item_xml in items:
-            title_m = re.search(r"<title[^>]*>(.*?)</title>", item_xml, re.DOTALL)
-            link_m = re.search(r"<link[^>]*>\s*(.*?)\s*</link>", item_xml, re.DOTALL)
-            if not link_m or not link_m.group(1).strip():
-                link_m = re.search(r'<link[^>]*href=["\']([^"\']+)["\']', item_xml)
-            desc_m = re.search(r"<description[^>]*>(.*?)</description>", item_xml, re.DOTALL)
-            date_m = re.search(r"<pubDate[^>]*>(.*?)</pubDate>", item_xml, re.DOTALL)
-            source_m = re.search(r'<source[^>]*url=["\']([^"\']*)["\'][^>]*>(.*?)</source>', item_xml, re.DOTALL)
-
-            raw_title = title_m.group(1).strip() if title_m else ""
-            if not raw_title:
-                continue
-
-            def _clean_cdata(s: str) -> str:
-                return re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", s, flags=re.DOTALL).strip()
-
-            title = _clean_cdata(raw_title)
-            link = _clean_cdata(link_m.group(1).strip()) if link_m else ""
-            desc = _clean_cdata(desc_m.group(1).strip()) if desc_m else ""
-            desc = re.sub(r"<[^>]+>", " ", desc)
-            desc = html.unescape(desc).strip()
-            desc = re.sub(r"\s+", " ", desc)
-
-            date = date_m.group(1).strip() if date_m else ""
-
-            entries.append({
-                "title": html.unescape(title),
-                "link": link,
-                "summary": desc,
-                "date": date,
-                "source": source_m.group(2).strip() if source_m else "",
-                "source_url": source_m.group(1).strip() if source_m else "",
-            })
-
-        if not entries:
-            atom_entries = re.findall(r"<entry>(.*?)</entry>", xml_text, re.DOTALL)
-            for entry_xml in atom_entries:
-                title_m = re.search(r"<title[^>]*>(.*?)</title>", entry_xml, re.DOTALL)
-                link_m = re.search(r'<link[^>]*href=["\']([^"\']+)["\']', entry_xml)
-                summary_m = re.search(r"<(?:summary|content)[^>]*>(.*?)</(?:summary|content)>", entry_xml, re.DOTALL)
-                date_m = re.search(r"<(?:published|updated)[^>]*>(.*?)</(?:published|updated)>", entry_xml, re.DOTALL)
-
-                raw_title = title_m.group(1).strip() if title_m else ""
-                if not raw_title:
-                    continue
+    def parse_rss_entries(xml: bytes, charset: str | None = None) -> list[dict]:
+        """Parse raw RSS/Atom feed bytes; see app.feeds.parse_rss_entries."""
+        return parse_rss_entries(xml, charset)
 
-                entries.append({
-                    "title": html.unescape(re.sub(r"<!\[CDATA\[(.*?)\]\]>", r"\1", raw_title, flags=re.DOTALL)),
-                    "link": link_m.group(1) if link_m else "",
-                    "summary": re.sub(r"<[^>]+>", " ", summary_m.group(1)).strip() if summary_m else "",
-                    "date": date_m.group(1).strip() if date_m else "",
-                    "source": "",
-                    "source_url": "",
-                })
-
-        return entries
-
-    def incident_from_feed_entry(self, entry: dict, source_name: str | None = None) -> BombingIncident | None:
+    async def incident_from_feed_entry(self, entry: dict, source_name: str | None = None) -> BombingIncident | None:
         title = entry.get("title", "")
         summary = entry.get("summary", "")
         combined = f"{title}. {summary}"
@@ -202,11 +122,11 @@ class BaseScraper(ABC):
         if not self.is_relevant(summary, title):
             return None
 
-        location = self.extract_location(title) or self.extract_location(summary)
+        location = await self.extract_location(title) or await self.extract_location(summary)
         if not location:
             return None
 
-        coords = get_coordinates(location)
+        coords = await get_coordinates_async(location)
         if not coords:
             return None
 
@@ -222,7 +142,7 @@ class BaseScraper(ABC):
             description += "..."
 
         return BombingIncident(
-            id=str(uuid.uuid4()),
+            id=incident_id(source_url, title),
             title=title,
             location=location,
             latitude=coords[0],
@@ -235,52 +155,32 @@ class BaseScraper(ABC):
             source_url=source_url,
         )
 
-    def parse_article(self, html_text: str, url: str) -> BombingIncident | None:
-        soup = BeautifulSoup(html_text, "lxml")
-
-        title_tag = soup.find("h1")
-        title = title_tag.get_text(strip=True) if title_tag else ""
-        if not title:
+    async def parse_article(self, html_text: str, url: str) -> BombingIncident | None:
+        # lxml releases the GIL while parsing, so other fetches keep running meanwhile
+        extracted = await asyncio.to_thread(_extract_article, html_text)
+        if extracted is None:
             return None
-
-        article_tag = (
-            soup.find("article")
-            or soup.find("div", class_=re.compile(r"article|story|content|body|post"))
-            or soup.find("main")
-        )
-        if article_tag:
-            paragraphs = article_tag.find_all("p")
-        else:
-            paragraphs = soup.find_all("p")
-
-        text = " ".join(p.get_text(strip=True) for p in paragraphs)
-        if not text or not self.is_relevant(text, title):
+        title, text, date_str = extracted
+        if not self.is_relevant(text, title):
             return None
 
-        location = self.extract_location(title) or self.extract_location(text)
+        location = await self.extract_location(title) or await self.extract_location(text)
         if not location:
             return None
 
-        coords = get_coordinates(location)
+        coords = await get_coordinates_async(location)
         if not coords:
             return None
 
         killed = self.extract_killed(text)
         wounded = self.extract_wounded(text)
 
-        time_tag = soup.find("time")
-        date_str = ""
-        if time_tag and time_tag.get("datetime"):
-            date_str = time_tag["datetime"][:10]
-        if not date_str:
-            date_str = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-
         description = text[:300].strip()
         if len(text) > 300:
             description += "..."
 
         return BombingIncident(
-            id=str(uuid.uuid4()),
+            id=incident_id(url, title),
             title=title,
             location=location,
             latitude=coords[0],
@@ -294,24 +194,34 @@ class BaseScraper(ABC):
         )
 
     def extract_article_links(self, html_text: str, base_url: str) -> list[str]:
-        soup = BeautifulSoup(html_text, "lxml")
+        tree = parse_html(html_text)
+        if tree is None:
+            return []
         links: set[str] = set()
+        base = base_url.rstrip("/")
+        # Listing pages put many links in one container; check each container's text once
+        parent_has_keyword: dict[lxml.html.HtmlElement, bool] = {}
 
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag["href"]
-            text = a_tag.get_text(strip=True).lower()
+        for a_tag in tree.iter("a"):
+            href = a_tag.get("href")
+            if href is None:
+                continue
+            text = element_text(a_tag).lower()
 
-            has_keyword = any(kw in text for kw in _ALL_KEYWORDS)
+            has_keyword = ANY_KEYWORD_MATCHER.search(text) is not None
             if not has_keyword:
-                parent_text = a_tag.parent.get_text(strip=True).lower() if a_tag.parent else ""
-                has_keyword = any(kw in parent_text for kw in _ALL_KEYWORDS)
+                parent = a_tag.getparent()
+                if parent is not None:
+                    has_keyword = parent_has_keyword.get(parent)
+                    if has_keyword is None:
+                        has_keyword = ANY_KEYWORD_MATCHER.search(element_text(parent).lower()) is not None
+                        parent_has_keyword[parent] = has_keyword
             if not has_keyword:
-                href_lower = href.lower()
-                has_keyword = any(kw.replace(" ", "-") in href_lower for kw in _ALL_KEYWORDS)
+                has_keyword = SLUG_KEYWORD_MATCHER.search(href.lower()) is not None
 
             if has_keyword:
                 if href.startswith("/"):
-                    href = base_url.rstrip("/") + href
+                    href = base + href
                 elif not href.startswith("http"):
                     continue
                 links.add(href)
@@ -324,25 +234,31 @@ class BaseScraper(ABC):
             resp = await client.get(feed_url)
             resp.raise_for_status()
 
-            entries = self.parse_rss_entries(resp.text)
+            entries = await asyncio.to_thread(self.parse_rss_entries, resp.content, resp.charset_encoding)
             logger.info(f"[{self.id}] Parsed {len(entries)} entries from feed")
 
             relevant = [e for e in entries if self.is_relevant(e.get("summary", ""), e.get("title", ""))]
             logger.info(f"[{self.id}] {len(relevant)} relevant entries")
 
-            for entry in relevant:
-                incident = self.incident_from_feed_entry(entry)
+            async def fetch_and_parse(entry: dict) -> BombingIncident | None:
+                incident = await self.incident_from_feed_entry(entry)
+                # A summary that already names casualties and runs long is as good as the article
+                if incident and incident.killed > 0 and len(incident.description) > FEED_COMPLETE_DESCRIPTION_LEN:
+                    return incident
 
                 if entry.get("link"):
                     try:
-                        art_resp = await client.get(entry["link"], follow_redirects=True)
+                        async with host_semaphore(entry["link"]):
+                            art_resp = await client.get(entry["link"], follow_redirects=True)
                         if art_resp.status_code == 200:
-                            full_incident = self.parse_article(art_resp.text, entry["link"])
+                            full_incident = await self.parse_article(art_resp.text, entry["link"])
                             if full_incident:
                                 incident = full_incident
                     except Exception:
                         pass
+                return incident
 
+            for incident in await asyncio.gather(*(fetch_and_parse(e) for e in relevant)):
                 if incident:
                     incidents.append(incident)
                     logger.info(f"[{self.id}] Feed incident: {incident.title[:60]} (killed={incident.killed})")
@@ -359,20 +275,23 @@ class BaseScraper(ABC):
             resp = await client.get(url)
             resp.raise_for_status()
 
-            article_links = self.extract_article_links(resp.text, base_url)
+            article_links = await asyncio.to_thread(self.extract_article_links, resp.text, base_url)
             logger.info(f"[{self.id}] Found {len(article_links)} potential articles")
 
-            for link in article_links:
+            async def fetch_and_parse(link: str) -> BombingIncident | None:
                 try:
-                    art_resp = await client.get(link)
+                    async with host_semaphore(link):
+                        art_resp = await client.get(link)
                     art_resp.raise_for_status()
-                    incident = self.parse_article(art_resp.text, link)
-                    if incident:
-                        incidents.append(incident)
-                        logger.info(f"[{self.id}] Extracted: {incident.title[:60]}")
+                    return await self.parse_article(art_resp.text, link)
                 except Exception as e:
                     logger.debug(f"[{self.id}] Failed to parse {link}: {e}")
-                    continue
+                    return None
+
+            for incident in await asyncio.gather(*(fetch_and_parse(link) for link in article_links)):
+                if incident:
+                    incidents.append(incident)
+                    logger.info(f"[{self.id}] Extracted: {incident.title[:60]}")
 
         except Exception as e:
             logger.warning(f"[{self.id}] Failed HTML scrape: {e}")
@@ -380,14 +299,22 @@ class BaseScraper(ABC):
         return incidents
 
 
-def _extract_count(text: str, patterns: list[re.Pattern], max_threshold: int) -> int:
-    result = 0
-    for pattern in patterns:
-        for match in pattern.findall(text):
-            try:
-                num = int(match)
-                if num < max_threshold:
-                    result = max(result, num)
-            except ValueError:
-                pass
-    return result
+def _extract_article(html_text: str) -> tuple[str, str, str] | None:
+    """Pull (title, paragraph text, date) out of an article page, or None if it has no title or text."""
+    tree = parse_html(html_text)
+    if tree is None:
+        return None
+
+    title_tag = next(tree.iter("h1"), None)
+    title = element_text(title_tag) if title_tag is not None else ""
+    if not title:
+        return None
+
+    container = article_container(tree)
+    # Every text node under the paragraphs in one XPath call, pieces space-separated
+    # so inline markup ("<a>killing</a> 12") doesn't glue words together
+    text = " ".join(t for t in map(str.strip, _PARAGRAPH_TEXT(container)) if t)
+    if not text:
+        return None
+
+    return title, text, article_date(tree)
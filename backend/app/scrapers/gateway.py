@@ -4,26 +4,93 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from collections import OrderedDict
 
 import httpx
 
+from app.dedup import NearDuplicateIndex
+from app.fetch import HEADERS, host_semaphores
 from app.models import BombingIncident
-from app.scrapers.base import BaseScraper, HEADERS
+from app.scrapers.base import BaseScraper
 
 logger = logging.getLogger(__name__)
 
+# Hop-by-hop and encoding headers that no longer describe a buffered, decoded body
+_STALE_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+class ResponseCache(httpx.AsyncBaseTransport):
+    """Transport wrapper that fetches each GET URL once per client.
+
+    Scrapers share one client per run and often link the same article (Google
+    News re-surfaces BBC/Reuters/AP stories), so successful responses are kept
+    in a bounded LRU and concurrent requests for a URL share one fetch.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, capacity: int = 256) -> None:
+        self._transport = transport
+        self._capacity = capacity
+        self._entries: OrderedDict[str, tuple[int, list[tuple[str, str]], bytes]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
+        if request.method != "GET" or conditional:
+            return await self._transport.handle_async_request(request)
+
+        key = str(request.url)
+        entry = self._entries.get(key)
+        if entry is None:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(self._fetch(request, key))
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # Shield so one cancelled caller doesn't abort the fetch for the others
+            entry = await asyncio.shield(task)
+        else:
+            self._entries.move_to_end(key)
+
+        status, headers, body = entry
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+    async def _fetch(self, request: httpx.Request, key: str) -> tuple[int, list[tuple[str, str]], bytes]:
+        response = await self._transport.handle_async_request(request)
+        try:
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        headers = [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _STALE_HEADERS]
+        entry = (response.status_code, headers, body)
+        if response.status_code == 200:
+            self._entries[key] = entry
+            if len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
 
 class ScraperGateway:
     """Central gateway that manages and orchestrates scraper services.
 
     Each scraper can be independently enabled or disabled at runtime.
     The gateway fans out requests to all enabled scrapers in parallel
-    and deduplicates results.
+    and deduplicates results. Call aclose() on shutdown to release the
+    shared HTTP client.
     """
 
     def __init__(self, scrapers: list[BaseScraper]) -> None:
         self._scrapers: dict[str, BaseScraper] = {s.id: s for s in scrapers}
         self._enabled: dict[str, bool] = {s.id: True for s in scrapers}
+        self._client: httpx.AsyncClient | None = None
+        self._cache: ResponseCache | None = None
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._active_runs = 0
 
     # ------------------------------------------------------------------
     # Integration registry
@@ -53,6 +120,39 @@ class ScraperGateway:
         """Return the enabled state or None if unknown."""
         return self._enabled.get(scraper_id)
 
+    # ------------------------------------------------------------------
+    # HTTP client
+    # ------------------------------------------------------------------
+
+    def _session(self) -> httpx.AsyncClient:
+        """Long-lived client whose keep-alive connections carry over between runs.
+
+        Created on first use so it binds to the running event loop. Each call
+        starts a run and must be paired with _end_run().
+        """
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            self._cache = ResponseCache(httpx.AsyncHTTPTransport(limits=limits))
+            self._client = httpx.AsyncClient(
+                headers=HEADERS, timeout=30.0, follow_redirects=True, transport=self._cache,
+            )
+            # Per-host limits live exactly as long as the client, on the same event loop
+            self._host_semaphores = {}
+        self._active_runs += 1
+        return self._client
+
+    def _end_run(self) -> None:
+        """Drop cached responses once the last overlapping run finishes, so bodies aren't held between runs."""
+        self._active_runs -= 1
+        if self._active_runs == 0 and self._cache is not None:
+            self._cache.clear()
+
+    async def aclose(self) -> None:
+        """Close the shared client; the next scrape opens a new one."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     # ------------------------------------------------------------------
     # Scraping
     # ------------------------------------------------------------------
@@ -64,20 +164,24 @@ class ScraperGateway:
             logger.warning("No scrapers enabled — nothing to scrape")
             return []
 
-        async with httpx.AsyncClient(headers=HEADERS, timeout=30.0, follow_redirects=True) as client:
-            tasks = [s.scrape(client) for s in active]
+        client = self._session()
+        token = host_semaphores.set(self._host_semaphores)
+        tasks = [s.scrape(client) for s in active]
+        try:
             results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            host_semaphores.reset(token)
+            self._end_run()
 
         incidents: list[BombingIncident] = []
-        seen_titles: set[str] = set()
+        seen_titles = NearDuplicateIndex()
 
         for result in results:
             if isinstance(result, list):
                 for incident in result:
-                    title_key = incident.title.lower().strip()
-                    if title_key not in seen_titles:
+                    # Drop near-identical headlines from different scrapers within this run
+                    if seen_titles.add_if_new(incident.title):
                         incidents.append(incident)
-                        seen_titles.add(title_key)
             elif isinstance(result, Exception):
                 logger.warning(f"Scraper failed: {result}")
 
@@ -90,9 +194,13 @@ class ScraperGateway:
         if not scraper:
             return []
 
-        async with httpx.AsyncClient(headers=HEADERS, timeout=30.0, follow_redirects=True) as client:
-            try:
-                return await scraper.scrape(client)
-            except Exception as e:
-                logger.warning(f"Scraper '{scraper_id}' failed: {e}")
-                return []
+        client = self._session()
+        token = host_semaphores.set(self._host_semaphores)
+        try:
+            return await scraper.scrape(client)
+        except Exception as e:
+            logger.warning(f"Scraper '{scraper_id}' failed: {e}")
+            return []
+        finally:
+            host_semaphores.reset(token)
+            self._end_run()